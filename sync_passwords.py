@@ -1,44 +1,54 @@
 #!/usr/bin/env python3
 
+import csv
+import io
 import json
+import os
+import shutil
 import subprocess
 import sys
-from datetime import datetime
-from pathlib import Path
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+import orjson
 from loguru import logger
-import pandas as pd
-import hashlib
-import csv
-from typing import Set
+
+READ_BUFFER_SIZE = 1 << 16
+# /dev/stdin is only available on POSIX platforms
+IMPORT_FROM_STDIN = os.name == 'posix'
+# Errors bw reports when it cannot open or read the /dev/stdin path itself
+STDIN_REFUSED_ERRORS = ('ENOENT', 'ENXIO', 'EISDIR')
+CLI_NOT_FOUND_MESSAGE = "LastPass CLI (lpass) and/or Bitwarden CLI (bw) not found. Please install both tools."
 
 class PasswordSyncError(Exception):
     pass
 
 class VaultEntry:
+    __slots__ = ('url', 'username', 'password', 'name', 'notes', '_key')
+
     def __init__(self, url: str, username: str, password: str, name: str, notes: str = ""):
         self.url = url or ""
         self.username = username or ""
         self.password = password or ""
         self.name = name or ""
         self.notes = notes or ""
-
-    def get_hash(self) -> str:
-        """Generate a unique hash for the entry based on its content"""
-        content = f"{self.url}{self.username}{self.password}{self.name}{self.notes}"
-        return hashlib.blake2b(content.encode(), digest_size=32).hexdigest()
+        # Identity key used for set membership when comparing vaults
+        self._key = (self.url, self.username, self.password, self.name, self.notes)
 
     def __eq__(self, other):
-        if not isinstance(other, VaultEntry):
-            return False
-        return self.get_hash() == other.get_hash()
+        return self is other or (isinstance(other, VaultEntry) and self._key == other._key)
 
     def __hash__(self):
-        return hash(self.get_hash())
+        return hash(self._key)
 
 class PasswordSync:
     def __init__(self):
         self.temp_dir = Path(tempfile.gettempdir())
+        # Resolve the CLIs once so each call skips the $PATH search
+        self.lpass = shutil.which('lpass') or 'lpass'
+        self.bw = shutil.which('bw') or 'bw'
         self.setup_logging()
 
     def setup_logging(self):
@@ -56,15 +66,29 @@ class PasswordSync:
             level="DEBUG"
         )
 
-    def check_cli_tools(self):
+    def collect_cli_status(self) -> Dict[str, subprocess.CompletedProcess]:
+        """Run the CLI version and login status commands concurrently"""
+        commands = {
+            'lpass_version': [self.lpass, '--version'],
+            'bw_version': [self.bw, '--version'],
+            'lpass_status': [self.lpass, 'status'],
+            'bw_status': [self.bw, 'status'],
+        }
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            futures = {name: executor.submit(subprocess.run, args, capture_output=True, text=True)
+                       for name, args in commands.items()}
+        try:
+            return {name: future.result() for name, future in futures.items()}
+        except FileNotFoundError:
+            raise PasswordSyncError(CLI_NOT_FOUND_MESSAGE)
+
+    def check_cli_tools(self, versions: Iterable[subprocess.CompletedProcess]):
         """Verify that both LastPass and Bitwarden CLI tools are installed"""
         try:
-            subprocess.run(['lpass', '--version'], capture_output=True, check=True)
-            subprocess.run(['bw', '--version'], capture_output=True, check=True)
+            for result in versions:
+                result.check_returncode()
         except subprocess.CalledProcessError as e:
             raise PasswordSyncError(f"CLI tool check failed: {str(e)}")
-        except FileNotFoundError:
-            raise PasswordSyncError("LastPass CLI (lpass) and/or Bitwarden CLI (bw) not found. Please install both tools.")
 
     def read_secret(self, secret_name: str) -> str:
         """Read a Docker secret from the secrets directory"""
@@ -74,17 +98,16 @@ class PasswordSync:
         except FileNotFoundError:
             raise PasswordSyncError(f"Secret {secret_name} not found")
 
-    def check_lastpass_login(self):
+    def check_lastpass_login(self, result: subprocess.CompletedProcess):
         """Check if logged into LastPass and login if needed using Docker secrets"""
         try:
-            result = subprocess.run(['lpass', 'status'], capture_output=True, text=True)
             if 'Not logged in' in result.stdout or 'Not logged in' in result.stderr:
                 username = self.read_secret('lastpass_username')
                 password = self.read_secret('lastpass_password')
                 
                 # Login with MFA
                 try:
-                    process = subprocess.run(['lpass', 'login', '--trust', username], 
+                    process = subprocess.run([self.lpass, 'login', '--trust', username], 
                                           input=password, 
                                           text=True, 
                                           capture_output=True)
@@ -97,10 +120,9 @@ class PasswordSync:
         except Exception as e:
             raise PasswordSyncError(f"Failed to check LastPass login: {str(e)}")
 
-    def check_bitwarden_login(self):
+    def check_bitwarden_login(self, result: subprocess.CompletedProcess):
         """Check if logged into Bitwarden and login if needed using Docker secrets"""
         try:
-            result = subprocess.run(['bw', 'status'], capture_output=True, text=True)
             status = json.loads(result.stdout)
             
             if status.get('status') != 'unlocked':
@@ -108,7 +130,7 @@ class PasswordSync:
                 password = self.read_secret('bitwarden_password')
                 
                 try:
-                    process = subprocess.run(['bw', 'login', email], 
+                    process = subprocess.run([self.bw, 'login', email], 
                                           input=password,
                                           text=True,
                                           capture_output=True)
@@ -121,87 +143,136 @@ class PasswordSync:
         except subprocess.CalledProcessError as e:
             raise PasswordSyncError(f"LastPass login failed: {str(e)}")
 
+    def read_cli_output(self, args) -> bytearray:
+        """Run a CLI export and return its output in a buffer the caller wipes after parsing"""
+        output = bytearray(READ_BUFFER_SIZE)
+        length = 0
+        # Read straight from the unbuffered pipe into our own buffer, so the vault
+        # never touches disk and no unwiped copy is left behind in a bytes object
+        with subprocess.Popen(args, stdout=subprocess.PIPE, bufsize=0) as process:
+            while True:
+                if length == len(output):
+                    grown = bytearray(len(output) * 2)
+                    grown[:length] = output
+                    output[:] = bytes(len(output))
+                    output = grown
+                with memoryview(output) as view, view[length:] as free:
+                    read = process.stdout.readinto(free)
+                if not read:
+                    break
+                length += read
+        del output[length:]
+        if process.returncode != 0:
+            output[:] = bytes(len(output))
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+        return output
+
+    def iter_buffer_lines(self, buffer: bytearray):
+        """Decode a buffer one line at a time instead of copying it whole"""
+        with memoryview(buffer) as view:
+            start = 0
+            while start < len(buffer):
+                end = buffer.find(b'\n', start) + 1 or len(buffer)
+                yield str(view[start:end], 'utf-8')
+                start = end
+
     def get_lastpass_entries(self) -> Set[VaultEntry]:
         """Export and parse LastPass entries"""
-        export_path = self.temp_dir / f"lastpass_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         try:
             logger.info("Exporting LastPass vault...")
-            subprocess.run(['lpass', 'export'], capture_output=True, text=True, check=True,
-                         stdout=open(export_path, 'w'))
-            
-            entries = set()
-            df = pd.read_csv(export_path)
-            for _, row in df.iterrows():
-                entry = VaultEntry(
-                    url=str(row.get('url', '')),
-                    username=str(row.get('username', '')),
-                    password=str(row.get('password', '')),
-                    name=str(row.get('name', '')),
-                    notes=str(row.get('notes', ''))
-                )
-                entries.add(entry)
+            raw = self.read_cli_output([self.lpass, 'export'])
+            try:
+                reader = csv.DictReader(self.iter_buffer_lines(raw))
+                entries = {
+                    VaultEntry(
+                        url=row.get('url', ''),
+                        username=row.get('username', ''),
+                        password=row.get('password', ''),
+                        name=row.get('name', ''),
+                        notes=row.get('notes', '')
+                    )
+                    for row in reader
+                }
+            finally:
+                raw[:] = bytes(len(raw))
             
             logger.info(f"Parsed {len(entries)} entries from LastPass")
             return entries
         except Exception as e:
             raise PasswordSyncError(f"Failed to export/parse LastPass vault: {str(e)}")
-        finally:
-            if export_path.exists():
-                export_path.unlink()
 
     def get_bitwarden_entries(self) -> Set[VaultEntry]:
         """Export and parse Bitwarden entries"""
-        export_path = self.temp_dir / f"bitwarden_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         try:
             logger.info("Exporting Bitwarden vault...")
-            subprocess.run(['bw', 'export', '--output', str(export_path), '--format', 'json'],
-                         capture_output=True, check=True)
-            
-            entries = set()
-            with open(export_path) as f:
-                data = json.load(f)
-                for item in data.get('items', []):
-                    if item.get('type') == 1:  # Login
-                        login = item.get('login', {})
-                        entry = VaultEntry(
-                            url=login.get('uri', ''),
-                            username=login.get('username', ''),
-                            password=login.get('password', ''),
-                            name=item.get('name', ''),
-                            notes=item.get('notes', '')
-                        )
-                        entries.add(entry)
+            raw = self.read_cli_output([self.bw, 'export', '--raw', '--format', 'json'])
+            try:
+                data = orjson.loads(raw)
+            finally:
+                raw[:] = bytes(len(raw))
+            entries = {
+                VaultEntry(
+                    url=login.get('uri', ''),
+                    username=login.get('username', ''),
+                    password=login.get('password', ''),
+                    name=item.get('name', ''),
+                    notes=item.get('notes', '')
+                )
+                for item in data.get('items', [])
+                if item.get('type') == 1  # Login
+                for login in (item.get('login', {}),)
+            }
             
             logger.info(f"Parsed {len(entries)} entries from Bitwarden")
             return entries
         except Exception as e:
             raise PasswordSyncError(f"Failed to export/parse Bitwarden vault: {str(e)}")
-        finally:
-            if export_path.exists():
-                export_path.unlink()
 
-    def prepare_import_csv(self, entries: Set[VaultEntry]) -> Path:
-        """Create a CSV file for Bitwarden import"""
-        import_path = self.temp_dir / f"bitwarden_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    def prepare_import_csv(self, entries: Set[VaultEntry]) -> bytes:
+        """Render the CSV data for Bitwarden import"""
         try:
-            with open(import_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['folder', 'favorite', 'type', 'name', 'notes', 'fields',
-                               'login_uri', 'login_username', 'login_password'])
-                for entry in entries:
-                    writer.writerow(['', '0', 'login', entry.name, entry.notes, '',
-                                   entry.url, entry.username, entry.password])
-            return import_path
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(['folder', 'favorite', 'type', 'name', 'notes', 'fields',
+                           'login_uri', 'login_username', 'login_password'])
+            writer.writerows(('', '0', 'login', entry.name, entry.notes, '',
+                              entry.url, entry.username, entry.password)
+                             for entry in entries)
+            return buffer.getvalue().encode('utf-8')
         except Exception as e:
             raise PasswordSyncError(f"Failed to prepare import CSV: {str(e)}")
 
-    def import_to_bitwarden(self, csv_path: Path):
-        """Import CSV file into Bitwarden"""
+    def import_from_temp_file(self, csv_data: bytes):
+        """Import CSV data into Bitwarden through a temporary file that is always removed"""
+        fd, path = tempfile.mkstemp(prefix='bitwarden_import_', suffix='.csv', dir=self.temp_dir)
+        import_path = Path(path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(csv_data)
+            subprocess.run([self.bw, 'import', 'lastpass', str(import_path)], check=True)
+        finally:
+            import_path.unlink(missing_ok=True)
+
+    def import_to_bitwarden(self, csv_data: bytes):
+        """Import CSV data into Bitwarden"""
         try:
             logger.info("Importing to Bitwarden...")
-            subprocess.run(['bw', 'import', 'lastpass', str(csv_path)], check=True)
+            if IMPORT_FROM_STDIN:
+                # Pipe the CSV straight to bw so the entries never touch disk
+                result = subprocess.run([self.bw, 'import', 'lastpass', '/dev/stdin'],
+                                      input=csv_data, stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    stderr = result.stderr.decode(errors='replace').strip()
+                    # Only retry when bw could not read the path; any other failure may
+                    # have partly imported, and a retry would duplicate entries
+                    if '/dev/stdin' not in stderr or not any(code in stderr for code in STDIN_REFUSED_ERRORS):
+                        raise PasswordSyncError(f"Failed to import to Bitwarden: {stderr}")
+                    logger.warning(f"bw cannot read /dev/stdin, retrying with a temporary file: {stderr}")
+                    self.import_from_temp_file(csv_data)
+            else:
+                self.import_from_temp_file(csv_data)
             logger.success("Successfully imported to Bitwarden")
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             raise PasswordSyncError(f"Failed to import to Bitwarden: {str(e)}")
 
     def find_differences(self, lastpass_entries: Set[VaultEntry],
@@ -213,13 +284,22 @@ class PasswordSync:
         """Main sync process"""
         try:
             logger.info("Starting password sync process...")
-            self.check_cli_tools()
-            self.check_lastpass_login()
-            self.check_bitwarden_login()
+            # Spawn all CLI checks at once, then evaluate their results in order
+            cli_status = self.collect_cli_status()
+            self.check_cli_tools([cli_status['lpass_version'], cli_status['bw_version']])
+            self.check_lastpass_login(cli_status['lpass_status'])
+            self.check_bitwarden_login(cli_status['bw_status'])
             
-            # Get entries from both vaults
-            lastpass_entries = self.get_lastpass_entries()
-            bitwarden_entries = self.get_bitwarden_entries()
+            if os.environ.get('DRY_RUN', '').lower() == 'skip':
+                logger.info("DRY_RUN=skip set, stopping after CLI and login checks.")
+                return
+            
+            # Get entries from both vaults; the exports are independent so run them side by side
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                lastpass_future = executor.submit(self.get_lastpass_entries)
+                bitwarden_future = executor.submit(self.get_bitwarden_entries)
+                lastpass_entries = lastpass_future.result()
+                bitwarden_entries = bitwarden_future.result()
             
             # Find differences
             entries_to_sync = self.find_differences(lastpass_entries, bitwarden_entries)
@@ -231,12 +311,8 @@ class PasswordSync:
             logger.info(f"Found {len(entries_to_sync)} entries to sync")
             
             # Always import when using Docker (no environment variable check needed)
-            import_path = self.prepare_import_csv(entries_to_sync)
-            self.import_to_bitwarden(import_path)
-            
-            # Cleanup
-            if import_path.exists():
-                import_path.unlink()
+            csv_data = self.prepare_import_csv(entries_to_sync)
+            self.import_to_bitwarden(csv_data)
             
             logger.success(f"Password sync completed successfully! Synced {len(entries_to_sync)} entries.")
         except PasswordSyncError as e:
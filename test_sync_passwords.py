@@ -1,6 +1,9 @@
 import pytest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock
+import csv
+import io
 import json
+import subprocess
 from pathlib import Path
 from sync_passwords import PasswordSync, PasswordSyncError, VaultEntry
 
@@ -40,82 +43,175 @@ def test_vault_entry_equality():
     assert entry1 != entry3
     assert len({entry1, entry2}) == 1  # Test hash functionality
 
+def test_vault_entry_slots():
+    entry = VaultEntry("url1", "user1", None, "name1")
+
+    assert entry.password == ""
+    assert entry.notes == ""
+    assert not hasattr(entry, '__dict__')
+    with pytest.raises(AttributeError):
+        entry.extra = "value"
+
+def test_vault_entry_field_boundaries():
+    entry1 = VaultEntry("url", "user1", "pass1", "name1", "note1")
+    entry2 = VaultEntry("urlu", "ser1", "pass1", "name1", "note1")
+
+    assert entry1 != entry2
+    assert len({entry1, entry2}) == 2
+
 @patch('subprocess.run')
-def test_check_cli_tools_success(mock_run):
+def test_collect_cli_status(mock_run):
     mock_run.return_value = MagicMock(returncode=0)
     sync = PasswordSync()
-    sync.check_cli_tools()
-    assert mock_run.call_count == 2
+    status = sync.collect_cli_status()
+    assert set(status) == {'lpass_version', 'bw_version', 'lpass_status', 'bw_status'}
+    assert mock_run.call_count == 4
 
 @patch('subprocess.run')
-def test_check_cli_tools_failure(mock_run):
+def test_collect_cli_status_missing_tool(mock_run):
     mock_run.side_effect = FileNotFoundError()
     sync = PasswordSync()
     with pytest.raises(PasswordSyncError):
-        sync.check_cli_tools()
+        sync.collect_cli_status()
+
+@patch('subprocess.run')
+@patch('shutil.which', side_effect=lambda name: f"/usr/local/bin/{name}")
+def test_cli_paths_resolved_once(mock_which, mock_run):
+    mock_run.return_value = MagicMock(returncode=0)
+    sync = PasswordSync()
+    sync.collect_cli_status()
+    assert mock_which.call_count == 2
+    assert {call.args[0][0] for call in mock_run.call_args_list} == {'/usr/local/bin/lpass', '/usr/local/bin/bw'}
+
+@patch('subprocess.run')
+def test_check_cli_tools_success(mock_run):
+    sync = PasswordSync()
+    sync.check_cli_tools([subprocess.CompletedProcess(['lpass', '--version'], 0),
+                          subprocess.CompletedProcess(['bw', '--version'], 0)])
+    mock_run.assert_not_called()
+
+@patch('subprocess.run')
+def test_check_cli_tools_failure(mock_run):
+    failed = subprocess.CompletedProcess(['bw', '--version'], returncode=127)
+    sync = PasswordSync()
+    with pytest.raises(PasswordSyncError):
+        sync.check_cli_tools([subprocess.CompletedProcess(['lpass', '--version'], 0), failed])
+    mock_run.assert_not_called()
 
 @patch('subprocess.run')
 def test_check_lastpass_login_success(mock_run):
-    mock_run.return_value = MagicMock(stdout="Logged in as user@example.com")
+    status = subprocess.CompletedProcess(['lpass', 'status'], 0, stdout="Logged in as user@example.com", stderr="")
     sync = PasswordSync()
-    sync.check_lastpass_login()
-    mock_run.assert_called_once()
+    sync.check_lastpass_login(status)
+    mock_run.assert_not_called()
 
 @patch('subprocess.run')
-@patch.dict('os.environ', {'LASTPASS_USERNAME': 'user', 'LASTPASS_PASSWORD': 'pass'})
 def test_check_lastpass_login_needs_login(mock_run):
-    mock_run.side_effect = [
-        MagicMock(stdout="Not logged in"),
-        MagicMock(returncode=0)
-    ]
+    mock_run.return_value = MagicMock(returncode=0)
+    status = subprocess.CompletedProcess(['lpass', 'status'], 1, stdout="Not logged in", stderr="")
     sync = PasswordSync()
-    sync.check_lastpass_login()
-    assert mock_run.call_count == 2
+    with patch.object(sync, 'read_secret', return_value='secret'):
+        sync.check_lastpass_login(status)
+    mock_run.assert_called_once()
 
 @patch('subprocess.run')
 def test_check_bitwarden_login_success(mock_run):
-    mock_run.return_value = MagicMock(stdout='{"status": "unlocked"}')
+    status = subprocess.CompletedProcess(['bw', 'status'], 0, stdout='{"status": "unlocked"}', stderr="")
     sync = PasswordSync()
-    sync.check_bitwarden_login()
-    mock_run.assert_called_once()
+    sync.check_bitwarden_login(status)
+    mock_run.assert_not_called()
 
 @patch('subprocess.run')
-@patch.dict('os.environ', {'BITWARDEN_USERNAME': 'user', 'BITWARDEN_PASSWORD': 'pass'})
 def test_check_bitwarden_login_needs_login(mock_run):
-    mock_run.side_effect = [
-        MagicMock(stdout='{"status": "locked"}'),
-        MagicMock(returncode=0)
-    ]
+    mock_run.return_value = MagicMock(returncode=0)
+    status = subprocess.CompletedProcess(['bw', 'status'], 0, stdout='{"status": "locked"}', stderr="")
     sync = PasswordSync()
-    sync.check_bitwarden_login()
-    assert mock_run.call_count == 2
+    with patch.object(sync, 'read_secret', return_value='secret'):
+        sync.check_bitwarden_login(status)
+    mock_run.assert_called_once()
 
-@patch('subprocess.run')
-@patch('pandas.read_csv')
-def test_get_lastpass_entries(mock_read_csv, mock_run):
-    mock_df = MagicMock()
-    mock_df.iterrows.return_value = [
-        (0, {'url': 'url1', 'username': 'user1', 'password': 'pass1', 'name': 'name1', 'notes': 'note1'})
-    ]
-    mock_read_csv.return_value = mock_df
+@patch('subprocess.Popen')
+def test_get_lastpass_entries(mock_popen, sample_lastpass_csv):
+    process = mock_popen.return_value.__enter__.return_value
+    process.stdout = io.BytesIO(sample_lastpass_csv.encode())
+    process.returncode = 0
     
     sync = PasswordSync()
     entries = sync.get_lastpass_entries()
+    assert len(entries) == 2
+    assert VaultEntry("https://example.com", "user1", "pass1", "Entry1", "note1") in entries
+    assert VaultEntry("https://test.com", "user2", "pass2", "Entry2", "note2") in entries
+
+@patch('subprocess.Popen')
+def test_get_lastpass_entries_failure(mock_popen):
+    process = mock_popen.return_value.__enter__.return_value
+    process.stdout = io.BytesIO(b"")
+    process.returncode = 1
+    
+    sync = PasswordSync()
+    with pytest.raises(PasswordSyncError):
+        sync.get_lastpass_entries()
+
+@patch('subprocess.Popen')
+def test_get_bitwarden_entries(mock_popen, sample_bitwarden_json):
+    process = mock_popen.return_value.__enter__.return_value
+    process.stdout = io.BytesIO(json.dumps(sample_bitwarden_json).encode())
+    process.returncode = 0
+    sync = PasswordSync()
+    entries = sync.get_bitwarden_entries()
     assert len(entries) == 1
     entry = entries.pop()
-    assert entry.url == 'url1'
+    assert entry.url == 'https://example.com'
     assert entry.username == 'user1'
 
-@patch('subprocess.run')
-def test_get_bitwarden_entries(mock_run, sample_bitwarden_json):
-    mock_run.return_value = MagicMock(returncode=0)
+@patch('subprocess.Popen')
+def test_read_cli_output(mock_popen):
+    process = mock_popen.return_value.__enter__.return_value
+    process.stdout = io.BytesIO(b"secret")
+    process.returncode = 0
+    sync = PasswordSync()
+    output = sync.read_cli_output(['lpass', 'export'])
+    assert isinstance(output, bytearray)
+    assert output == b"secret"
+
+@patch('subprocess.Popen')
+def test_read_cli_output_grows_buffer(mock_popen):
+    payload = bytes(range(256)) * 1024  # larger than the initial read buffer
+    process = mock_popen.return_value.__enter__.return_value
+    process.stdout = io.BytesIO(payload)
+    process.returncode = 0
+    sync = PasswordSync()
+    assert sync.read_cli_output(['bw', 'export']) == payload
+
+def test_get_lastpass_entries_wipes_buffer(sample_lastpass_csv):
+    raw = bytearray(sample_lastpass_csv.encode())
     sync = PasswordSync()
-    with patch('builtins.open', mock_open(read_data=json.dumps(sample_bitwarden_json))):
-        entries = sync.get_bitwarden_entries()
-        assert len(entries) == 1
-        entry = entries.pop()
-        assert entry.url == 'https://example.com'
-        assert entry.username == 'user1'
+    with patch.object(sync, 'read_cli_output', return_value=raw):
+        assert len(sync.get_lastpass_entries()) == 2
+    assert raw == bytes(len(raw))
+
+def test_get_lastpass_entries_wipes_buffer_on_parse_failure():
+    raw = bytearray(b"url,username\n\xff\xfe,user1\n")  # invalid UTF-8
+    sync = PasswordSync()
+    with patch.object(sync, 'read_cli_output', return_value=raw):
+        with pytest.raises(PasswordSyncError):
+            sync.get_lastpass_entries()
+    assert raw == bytes(len(raw))
+
+def test_get_bitwarden_entries_wipes_buffer(sample_bitwarden_json):
+    raw = bytearray(json.dumps(sample_bitwarden_json).encode())
+    sync = PasswordSync()
+    with patch.object(sync, 'read_cli_output', return_value=raw):
+        assert len(sync.get_bitwarden_entries()) == 1
+    assert raw == bytes(len(raw))
+
+def test_get_bitwarden_entries_wipes_buffer_on_parse_failure():
+    raw = bytearray(b'{"items": [')
+    sync = PasswordSync()
+    with patch.object(sync, 'read_cli_output', return_value=raw):
+        with pytest.raises(PasswordSyncError):
+            sync.get_bitwarden_entries()
+    assert raw == bytes(len(raw))
 
 def test_find_differences():
     entry1 = VaultEntry("url1", "user1", "pass1", "name1", "note1")
@@ -129,16 +225,75 @@ def test_find_differences():
     assert len(differences) == 1
     assert differences.pop() == entry2
 
+def test_find_differences_identical_vaults():
+    lastpass_entries = {VaultEntry("url1", "user1", "pass1", "name1", "note1")}
+    bitwarden_entries = {VaultEntry("url1", "user1", "pass1", "name1", "note1")}
+    
+    sync = PasswordSync()
+    assert sync.find_differences(lastpass_entries, bitwarden_entries) == set()
+
+@patch.dict('os.environ', {'DRY_RUN': 'skip'})
+def test_sync_dry_run_skips_exports():
+    sync = PasswordSync()
+    with patch.object(sync, 'collect_cli_status', return_value=MagicMock()), \
+         patch.object(sync, 'check_cli_tools'), \
+         patch.object(sync, 'check_lastpass_login'), \
+         patch.object(sync, 'check_bitwarden_login'), \
+         patch.object(sync, 'get_lastpass_entries') as mock_lastpass, \
+         patch.object(sync, 'get_bitwarden_entries') as mock_bitwarden:
+        sync.sync()
+    mock_lastpass.assert_not_called()
+    mock_bitwarden.assert_not_called()
+
 @patch('subprocess.run')
+@patch('sync_passwords.IMPORT_FROM_STDIN', True)
 def test_import_to_bitwarden(mock_run):
     mock_run.return_value = MagicMock(returncode=0)
     sync = PasswordSync()
-    sync.import_to_bitwarden(Path("test.csv"))
+    sync.import_to_bitwarden(b"csv data")
+    mock_run.assert_called_once()
+    assert mock_run.call_args.args[0][-1] == '/dev/stdin'
+    assert mock_run.call_args.kwargs['input'] == b"csv data"
+
+@patch('subprocess.run')
+@patch('sync_passwords.IMPORT_FROM_STDIN', True)
+def test_import_to_bitwarden_stdin_refused(mock_run):
+    mock_run.side_effect = [
+        MagicMock(returncode=1, stderr=b"ENXIO: no such device or address, open '/dev/stdin'"),
+        MagicMock(returncode=0)
+    ]
+    sync = PasswordSync()
+    sync.import_to_bitwarden(b"csv data")
+    assert mock_run.call_count == 2
+    import_path = Path(mock_run.call_args.args[0][-1])
+    assert import_path.parent == sync.temp_dir
+    assert not import_path.exists()  # Cleaned up after import
+
+@patch('subprocess.run')
+@patch('sync_passwords.IMPORT_FROM_STDIN', False)
+def test_import_to_bitwarden_temp_file_fallback(mock_run):
+    mock_run.return_value = MagicMock(returncode=0)
+    sync = PasswordSync()
+    sync.import_to_bitwarden(b"csv data")
+    mock_run.assert_called_once()
+    import_path = Path(mock_run.call_args.args[0][-1])
+    assert import_path.parent == sync.temp_dir
+    assert not import_path.exists()  # Cleaned up after import
+
+@patch('subprocess.run')
+@patch('sync_passwords.IMPORT_FROM_STDIN', True)
+def test_import_to_bitwarden_failure(mock_run):
+    mock_run.return_value = MagicMock(returncode=1, stderr=b"You are not logged in.")
+    sync = PasswordSync()
+    with patch('tempfile.mkstemp') as mock_mkstemp:
+        with pytest.raises(PasswordSyncError, match="You are not logged in"):
+            sync.import_to_bitwarden(b"csv data")
     mock_run.assert_called_once()
+    mock_mkstemp.assert_not_called()
 
 def test_prepare_import_csv():
     sync = PasswordSync()
     entries = {VaultEntry("url1", "user1", "pass1", "name1", "note1")}
-    import_path = sync.prepare_import_csv(entries)
-    assert import_path.exists()
-    import_path.unlink()  # Cleanup
\ No newline at end of file
+    csv_data = sync.prepare_import_csv(entries)
+    rows = list(csv.reader(io.StringIO(csv_data.decode())))
+    assert rows[1] == ['', '0', 'login', 'name1', 'note1', '', 'url1', 'user1', 'pass1']
\ No newline at end of file